@@ -0,0 +1,49 @@
+"""
+Build all six visualization reports in a single process.
+
+Running the generators through one interpreter lets them share the cached
+NPK dataframe, the registered plotly template, and the warmed-up JSON
+serializer instead of paying those costs once per script. Reports that
+fail (e.g. a missing optional input) are reported at the end without
+blocking the rest of the batch.
+
+Usage: python generate_all.py
+"""
+
+import importlib
+import time
+
+REPORT_MODULES = [
+    'visualization_1_data_collection.generate_data_collection_story',
+    'visualization_2_spectral_explorer.generate_spectral_explorer',
+    'visualization_3_npk_experiment.generate_npk_experiment',
+    'visualization_4_st_variance.generate_st_variance_analysis',
+    'visualization_5_lnc_classification.generate_lnc_classification',
+    'visualization_6_nst_ratio_analysis.generate_nst_ratio_analysis',
+]
+
+
+def main():
+    batch_start = time.perf_counter()
+    failures = []
+
+    for module_name in REPORT_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module_name).main()
+        except Exception as exc:
+            failures.append((module_name, exc))
+            print(f"\nFAILED: {module_name}: {exc}\n")
+        else:
+            print(f"\n[{module_name}: {time.perf_counter() - start:.1f}s]\n")
+
+    print("=" * 70)
+    print(f"Batch finished in {time.perf_counter() - batch_start:.1f}s "
+          f"({len(REPORT_MODULES) - len(failures)}/{len(REPORT_MODULES)} reports built)")
+    for module_name, exc in failures:
+        print(f"  FAILED {module_name}: {exc}")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
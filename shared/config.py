@@ -87,6 +87,30 @@ MONTH_LABELS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
 MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
                'July', 'August', 'September', 'October', 'November', 'December']
 
+# =============================================================================
+# PLOTLY TEMPLATE
+# =============================================================================
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# Layout settings every report repeats, registered once and layered on top
+# of the stock theme; individual figures only override what differs
+pio.templates['crops'] = go.layout.Template(
+    layout=dict(
+        title=dict(font=dict(size=16)),
+        height=500,
+        legend=dict(
+            orientation='h',
+            yanchor='top',
+            y=-0.15,
+            xanchor='center',
+            x=0.5
+        )
+    )
+)
+pio.templates.default = 'plotly+crops'
+
 # =============================================================================
 # HTML STYLING
 # =============================================================================
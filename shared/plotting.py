@@ -0,0 +1,76 @@
+"""
+Shared plotting helpers.
+
+Hosts the trace-downsampling utility used by the timeline charts
+(Plotly's client-side rendering degrades with dense traces, so series
+beyond MAX_TRACE_POINTS are thinned before they reach the figure) and
+the figure-inlining helper the report generators embed their charts
+with.
+"""
+
+import numpy as np
+import plotly.io as pio
+
+# Traces longer than this get thinned before they are handed to Plotly
+MAX_TRACE_POINTS = 200
+
+
+def fig_to_div(fig, div_id):
+    """Inline a figure as a bare div plus one Plotly.newPlot call.
+
+    Serializes the figure exactly once via pio.to_json (validate=False
+    skips the schema walk) instead of going through to_html's template
+    rendering, config injection and div-ID generation; plotly.js is
+    loaded once per report from the shared vendored copy by the script
+    tag in the page head.
+    """
+    var_name = div_id.replace('-', '_') + '_fig'
+    payload = pio.to_json(fig, validate=False)
+    return (
+        f'<div id="{div_id}"></div>\n'
+        f'    <script>var {var_name} = {payload};\n'
+        f'    Plotly.newPlot("{div_id}", {var_name}.data, {var_name}.layout, {{responsive: true}});</script>'
+    )
+
+
+def downsample_lttb(x, y, n_out=MAX_TRACE_POINTS):
+    """Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of the points to keep: the first and last, plus one
+    per bucket chosen to form the largest triangle with the previously kept
+    point and the next bucket's average. Preserves the visual shape of the
+    series while cutting payload and render time linearly.
+    """
+    x = np.asarray(x)
+    if x.dtype.kind in 'mM':  # datetime/timedelta -> integer epoch units
+        x = x.view('i8')
+    x = x.astype('float64')
+    y = np.asarray(y, dtype='float64')
+
+    n = x.size
+    if n <= n_out:
+        return np.arange(n)
+
+    bucket_edges = np.linspace(1, n - 1, n_out - 1, dtype=np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = bucket_edges[i], bucket_edges[i + 1]
+        # Average of the following bucket (or the final point) is the
+        # third triangle vertex
+        if i + 2 < n_out - 1:
+            nlo, nhi = bucket_edges[i + 1], bucket_edges[i + 2]
+        else:
+            nlo, nhi = n - 1, n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+
+        ax, ay = x[a], y[a]
+        areas = np.abs((ax - avg_x) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y - ay))
+        a = lo + int(areas.argmax())
+        keep[i + 1] = a
+
+    return keep
@@ -13,11 +13,14 @@ Author: Data Science Visualization Course Project
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
-from scipy import stats
+import functools
+import json
 import os
 import sys
 from datetime import datetime
+from string import Template
 
 # Add shared config to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -25,6 +28,15 @@ from shared.config import (
     TREATMENT_COLORS, TREATMENT_DESCRIPTIONS, TREATMENT_ORDER, NPK_TREATMENTS,
     HTML_STYLE, NPK_DATASET_PATH
 )
+from shared.plotting import fig_to_div
+
+# Serialize figures with orjson when available - its numpy fast path is much
+# quicker than the stdlib json encoder for the array-heavy traces here
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = 'orjson'
+except ImportError:
+    pass
 
 # =============================================================================
 # DATA LOADING
@@ -33,12 +45,38 @@ from shared.config import (
 def load_npk_data():
     """Load and prepare NPK experiment data."""
     print("Loading NPK dataset...")
-    df = pd.read_csv(NPK_DATASET_PATH)
+    # Only the 4 analysis columns are needed out of the ~1500 in the CSV
+    # (the rest are raw spectral bands); declaring dtypes up front skips the
+    # float64->float32 and object->categorical conversion passes entirely
+    df = pd.read_csv(
+        NPK_DATASET_PATH,
+        usecols=['treatment', 'N_Value', 'ST_Value', 'parsed_date'],
+        dtype={
+            'N_Value': 'float32',
+            'ST_Value': 'float32',
+            # Ordered categorical: groupbys run on int8 codes and category
+            # order matches TREATMENT_ORDER
+            'treatment': pd.CategoricalDtype(categories=TREATMENT_ORDER, ordered=True)
+        },
+        parse_dates=['parsed_date']
+    )
 
-    df['parsed_date'] = pd.to_datetime(df['parsed_date'])
-    df['year'] = df['parsed_date'].dt.year
-    df['month'] = df['parsed_date'].dt.month
-    df['N_ST_Ratio'] = df['N_Value'] / df['ST_Value'].replace(0, np.nan)
+    df['year'] = df['parsed_date'].dt.year.astype('int16')
+    df['month'] = df['parsed_date'].dt.month.astype('int8')
+    # Month-start timestamp via C-level truncation; shared by every monthly
+    # bucketing below instead of per-function .dt.to_period passes
+    df['month_start'] = df['parsed_date'].values.astype('datetime64[M]').astype('datetime64[ns]')
+    # Integer day stamp for distinct-date counts without materializing
+    # Python date objects via .dt.date
+    df['date_ordinal'] = df['parsed_date'].values.astype('datetime64[D]').view(np.int64)
+
+    # Masked ufunc division: single NumPy pass, no intermediate Series from
+    # Series.replace and no division-by-zero warnings
+    n = df['N_Value'].to_numpy()
+    st = df['ST_Value'].to_numpy()
+    ratio = np.full(n.shape, np.nan, dtype=np.float32)
+    np.divide(n, st, out=ratio, where=st != 0)
+    df['N_ST_Ratio'] = ratio
 
     print(f"Loaded {len(df)} NPK samples")
     return df
@@ -48,9 +86,41 @@ def load_npk_data():
 # VISUALIZATION FUNCTIONS
 # =============================================================================
 
+# Preformatted row templates: one format call per row instead of building
+# each cell with a separate f-string concatenation
+TREATMENT_ROW_TEMPLATE = '''
+        <tr>
+            <td style="color: {color}; font-weight: bold; font-size: 1.1em;">{treatment}</td>
+            <td>{n_level}</td>
+            <td>{desc}</td>
+            <td>{trees}</td>
+            <td>{sample_count}</td>
+            <td>{date_range}</td>
+        </tr>
+        '''
+
+SUMMARY_ROW_TEMPLATE = (
+    '<tr>'
+    '<td style="color: {color}; font-weight: bold;">{Treatment}</td>'
+    '<td>{N Level}</td>'
+    '<td>{Trees}</td>'
+    '<td>{Samples}</td>'
+    '<td>{Dates}</td>'
+    '<td>{N_Value (mean ± std)}</td>'
+    '<td>{ST_Value (mean ± std)}</td>'
+    '</tr>'
+)
+
+
 def create_treatment_table(df):
     """Create HTML table for NPK treatments with sample counts and date range."""
-    table_html = '''
+    # One min/max/size aggregation plus vectorized strftime on the 5-row
+    # result, instead of per-treatment reductions and scalar strftime calls
+    date_agg = df.groupby('treatment', observed=True)['parsed_date'].agg(['min', 'max', 'size'])
+    date_agg['min_str'] = date_agg['min'].dt.strftime('%b %Y')
+    date_agg['max_str'] = date_agg['max'].dt.strftime('%b %Y')
+
+    rows = ['''
     <table class="treatment-table" style="width: 100%; margin: 20px auto;">
         <tr>
             <th>Treatment</th>
@@ -60,60 +130,61 @@ def create_treatment_table(df):
             <th>Total Samples</th>
             <th>Date Range</th>
         </tr>
-    '''
+    ''']
 
     for treatment in TREATMENT_ORDER:
-        color = TREATMENT_COLORS[treatment]
-        desc = TREATMENT_DESCRIPTIONS[treatment]
-        trees = NPK_TREATMENTS[treatment]
-        n_level = treatment.replace('N', '')
-
         # Get sample count and date range for this treatment
-        trt_df = df[df['treatment'] == treatment]
-        sample_count = len(trt_df)
-        if len(trt_df) > 0:
-            date_min = trt_df['parsed_date'].min().strftime('%b %Y')
-            date_max = trt_df['parsed_date'].max().strftime('%b %Y')
-            date_range = f"{date_min} - {date_max}"
+        if treatment in date_agg.index:
+            sample_count = int(date_agg.at[treatment, 'size'])
+            date_range = f"{date_agg.at[treatment, 'min_str']} - {date_agg.at[treatment, 'max_str']}"
         else:
+            sample_count = 0
             date_range = "N/A"
 
-        table_html += f'''
-        <tr>
-            <td style="color: {color}; font-weight: bold; font-size: 1.1em;">{treatment}</td>
-            <td>{n_level}</td>
-            <td>{desc}</td>
-            <td>{', '.join(map(str, trees))}</td>
-            <td>{sample_count}</td>
-            <td>{date_range}</td>
-        </tr>
-        '''
+        rows.append(TREATMENT_ROW_TEMPLATE.format(
+            color=TREATMENT_COLORS[treatment],
+            treatment=treatment,
+            n_level=treatment.replace('N', ''),
+            desc=TREATMENT_DESCRIPTIONS[treatment],
+            trees=', '.join(map(str, NPK_TREATMENTS[treatment])),
+            sample_count=sample_count,
+            date_range=date_range
+        ))
 
-    table_html += '</table>'
-    return table_html
+    rows.append('</table>')
+    return ''.join(rows)
 
 
 def create_timeline_chart(df):
     """Create sample collection timeline by treatment with pastel colors and labels for non-5 counts."""
-    df['year_month'] = df['parsed_date'].dt.to_period('M')
-    timeline_data = df.groupby(['year_month', 'treatment']).size().reset_index(name='count')
-    timeline_data['date'] = timeline_data['year_month'].dt.to_timestamp()
+    # Integer month keys (months since epoch, one vectorized view) so the
+    # groupby runs on a flat i8 grouper; timestamps are rebuilt only for
+    # the ~40 unique buckets left on the index
+    ym = df['month_start'].values.astype('datetime64[M]').view('i8')
+    timeline_counts = (
+        df.groupby([ym, 'treatment'], observed=True, sort=True)
+        .size()
+        .unstack('treatment', fill_value=0)
+    )
+    timeline_counts.index = timeline_counts.index.to_numpy().view('datetime64[M]').astype('datetime64[ns]')
 
     fig = go.Figure()
 
     for treatment in TREATMENT_ORDER:
-        treatment_data = timeline_data[timeline_data['treatment'] == treatment]
-        if len(treatment_data) > 0:
+        if treatment in timeline_counts.columns:
+            treatment_counts = timeline_counts[treatment]
+            treatment_counts = treatment_counts[treatment_counts > 0]
+
             # Create text labels: show count only if different from 5
-            text_labels = [str(c) if c != 5 else '' for c in treatment_data['count']]
+            text_labels = [str(c) if c != 5 else '' for c in treatment_counts]
 
             # Use pastel colors (same opacity as 3.2 ridgelines)
             pastel_color = hex_to_rgba(TREATMENT_COLORS[treatment], 0.6)
             border_color = TREATMENT_COLORS[treatment]
 
             fig.add_trace(go.Bar(
-                x=treatment_data['date'],
-                y=treatment_data['count'],
+                x=treatment_counts.index,
+                y=treatment_counts.values,
                 name=treatment,
                 marker=dict(
                     color=pastel_color,
@@ -151,6 +222,7 @@ def create_timeline_chart(df):
     return fig
 
 
+@functools.lru_cache(maxsize=None)
 def hex_to_rgba(hex_color, opacity):
     """Convert hex color to rgba string."""
     hex_color = hex_color.lstrip('#')
@@ -160,6 +232,25 @@ def hex_to_rgba(hex_color, opacity):
     return f'rgba({r}, {g}, {b}, {opacity})'
 
 
+def gaussian_kde_grid(samples, grid):
+    """Fixed-bandwidth Gaussian KDE evaluated on a regular grid.
+
+    Matches scipy.stats.gaussian_kde with Scott's rule, but runs as one
+    vectorized exp/sum pass without the per-call covariance machinery.
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    h = samples.std(ddof=1) * samples.size ** -0.2
+    z = (grid[:, None] - samples[None, :]) / h
+    return np.exp(-0.5 * z * z).sum(axis=1) / (samples.size * h * np.sqrt(2 * np.pi))
+
+
+# Scale-up guards for the raw scatter: SVG markers degrade past ~10k points
+# and WebGL past ~50k, so switch renderers / pre-bin before handing to Plotly
+SCATTERGL_THRESHOLD = 4000
+HEATMAP_THRESHOLD = 50_000
+HEATMAP_SAMPLE_SIZE = 2000
+
+
 def create_combined_scatter_ridgeline(df):
     """Create combined visualization with scatter plot (centroids) and ridgeline distributions.
 
@@ -198,161 +289,171 @@ def create_combined_scatter_ridgeline(df):
     n_range_vals = np.linspace(n_min - n_padding, n_max + n_padding, n_points)
     st_range_vals = np.linspace(st_min - st_padding, st_max + st_padding, n_points)
 
-    # Calculate centroids for each treatment
-    centroids = {}
-    for treatment in TREATMENT_ORDER:
-        treatment_data = df[df['treatment'] == treatment]
-        if len(treatment_data) > 0:
-            centroids[treatment] = {
-                'n_mean': treatment_data['N_Value'].mean(),
-                'n_median': treatment_data['N_Value'].median(),
-                'st_mean': treatment_data['ST_Value'].mean(),
-                'st_median': treatment_data['ST_Value'].median()
-            }
+    # Closed-polygon grids (out and back) shared by every ridge trace
+    n_grid_closed = np.concatenate((n_range_vals, n_range_vals[::-1]))
+    st_grid_closed = np.concatenate((st_range_vals, st_range_vals[::-1]))
 
     # =========================================================================
-    # SCATTER PLOT (bottom-left) - with hidden centroid markers
+    # BUILD ALL TRACES IN A SINGLE PASS PER TREATMENT
+    # Scatter + hidden centroid (bottom-left), N ridgeline (top),
+    # ST ridgeline (right) - one group lookup per treatment instead of four
     # =========================================================================
+    ridge_height = 0.50  # Height of each ridge
+    fill_opacity = 0.20  # High transparency to see through
+
+    # Position map: N10 at baseline 0 (closest to scatter), N150 at highest baseline
+    position_map = {t: i for i, t in enumerate(TREATMENT_ORDER)}
+
+    # Group membership as raw positional index arrays (no per-group frame
+    # materialization) over the two value columns pulled out once; every
+    # centroid, scatter and KDE input below is a single fancy-index away
+    idx_map = df.groupby('treatment', observed=True, sort=False).indices
+    n_vals = df['N_Value'].to_numpy()
+    st_vals = df['ST_Value'].to_numpy()
+
+    # Precompute the translucent ridge fill colors once per figure
+    fillcolors = {t: hex_to_rgba(TREATMENT_COLORS[t], fill_opacity) for t in TREATMENT_ORDER}
+
+    scatter_traces = []
+    centroid_points = []
+    ridge_n_traces = []
+    ridge_st_traces = []
+
     for treatment in TREATMENT_ORDER:
-        treatment_data = df[df['treatment'] == treatment]
-        if len(treatment_data) == 0:
+        idx = idx_map.get(treatment)
+        if idx is None or idx.size == 0:
             continue
 
+        treatment_n = n_vals[idx]
+        treatment_st = st_vals[idx]
         color = TREATMENT_COLORS[treatment]
-
-        # Add scatter points
-        fig.add_trace(
-            go.Scatter(
-                x=treatment_data['N_Value'],
-                y=treatment_data['ST_Value'],
+        n_mean = treatment_n.mean()
+        st_mean = treatment_st.mean()
+
+        # Scatter points (bottom-left); huge groups get a binned heatmap with
+        # a thin random-sample overlay, large groups go through WebGL
+        if treatment_n.size > HEATMAP_THRESHOLD:
+            counts, x_edges, y_edges = np.histogram2d(
+                treatment_n, treatment_st, bins=200
+            )
+            scatter_traces.append(
+                go.Heatmap(
+                    x=x_edges,
+                    y=y_edges,
+                    z=counts.T,
+                    colorscale=[[0, 'rgba(255,255,255,0)'], [1, color]],
+                    showscale=False,
+                    name=treatment,
+                    legendgroup=treatment,
+                    hovertemplate=f'{treatment}<br>N: %{{x:.2f}}%<br>ST: %{{y:.1f}} mg/g<br>Samples: %{{z}}<extra></extra>'
+                )
+            )
+            sample = np.random.RandomState(0).choice(treatment_n.size, HEATMAP_SAMPLE_SIZE, replace=False)
+            treatment_n = treatment_n[sample]
+            treatment_st = treatment_st[sample]
+
+        scatter_cls = go.Scattergl if treatment_n.size > SCATTERGL_THRESHOLD else go.Scatter
+        scatter_traces.append(
+            scatter_cls(
+                x=treatment_n,
+                y=treatment_st,
                 mode='markers',
                 name=treatment,
                 marker=dict(color=color, size=8, opacity=0.6),
                 hovertemplate=f'{treatment}<br>N: %{{x:.2f}}%<br>ST: %{{y:.1f}} mg/g<extra></extra>',
                 legendgroup=treatment
-            ),
-            row=2, col=1
-        )
-
-    # Add centroid markers on scatter plot (initially hidden) - one for each treatment
-    for treatment in TREATMENT_ORDER:
-        if treatment not in centroids:
-            continue
-        color = TREATMENT_COLORS[treatment]
-        n_mean = centroids[treatment]['n_mean']
-        st_mean = centroids[treatment]['st_mean']
-
-        # Centroid marker on scatter plot - diamond with label
-        fig.add_trace(
-            go.Scatter(
-                x=[n_mean],
-                y=[st_mean],
-                mode='markers+text',
-                marker=dict(symbol='diamond', size=18, color=color,
-                           line=dict(color='white', width=2)),
-                text=[f'{treatment}'],
-                textposition='top center',
-                textfont=dict(size=11, color=color, family='Arial Black'),
-                showlegend=False,
-                visible=False,
-                legendgroup=treatment,
-                name=f'centroid_scatter_{treatment}',
-                hovertemplate=f'<b>{treatment} Centroid</b><br>N: {n_mean:.2f}%<br>ST: {st_mean:.1f} mg/g<extra></extra>'
-            ),
-            row=2, col=1
+            )
         )
 
-    # =========================================================================
-    # N_VALUE RIDGELINE (top - horizontal KDEs)
-    # N10 closest to scatter (baseline=0), but drawn ON TOP of others
-    # High transparency so you can see through overlapping distributions
-    # =========================================================================
-    ridge_height = 0.50  # Height of each ridge
-    fill_opacity = 0.20  # High transparency to see through
-
-    # Position map: N10 at baseline 0 (closest to scatter), N150 at highest baseline
-    position_map = {t: i for i, t in enumerate(TREATMENT_ORDER)}
-
-    # Draw in reversed order so N10 is drawn last (on top)
-    draw_order = list(reversed(TREATMENT_ORDER))  # [N150, N100, N60, N30, N10]
-
-    for treatment in draw_order:
-        treatment_data = df[df['treatment'] == treatment]['N_Value'].dropna()
-        if len(treatment_data) < 3:
-            continue
-
-        try:
-            kde = stats.gaussian_kde(treatment_data)
-            density = kde(n_range_vals)
-            density = density / density.max() * ridge_height * 1.2
-        except:
-            continue
+        # Centroid point for the single shared centroid trace below
+        centroid_points.append((treatment, n_mean, st_mean, color))
 
         # Baseline position based on treatment order (N10=0, N40=1, N60=2, N100=3, N150=4)
         pos = position_map[treatment]
-        y_baseline = pos * (ridge_height * 0.9)
-        y_values = y_baseline + density
-
-        color = TREATMENT_COLORS[treatment]
-        n_mean = centroids[treatment]['n_mean']
-
-        # Fill area - clickable with treatment info
-        fig.add_trace(
-            go.Scatter(
-                x=list(n_range_vals) + list(n_range_vals)[::-1],
-                y=list(y_values) + [y_baseline] * len(n_range_vals),
-                fill='toself',
-                fillcolor=hex_to_rgba(color, fill_opacity),
-                line=dict(color=color, width=1.5),
-                showlegend=False,
-                name=f'ridge_n_{treatment}',
-                hovertemplate=f'<b>{treatment}</b><br>Mean N: {n_mean:.2f}%<br>Click to show centroid on scatter plot<extra></extra>',
-                legendgroup=treatment,
-                meta={'treatment': treatment, 'type': 'ridge_n'}
-            ),
-            row=1, col=1
-        )
 
-    # =========================================================================
-    # ST_VALUE RIDGELINE (right - vertical KDEs, rotated 90 degrees)
-    # Same logic: N10 closest to scatter, drawn on top
-    # =========================================================================
-    for treatment in draw_order:
-        treatment_data = df[df['treatment'] == treatment]['ST_Value'].dropna()
-        if len(treatment_data) < 3:
-            continue
+        # N ridgeline (top - horizontal KDE); explicit degenerate-data guard
+        # (too few points or zero spread means a zero bandwidth) instead of
+        # a try/except around the KDE call
+        n_data = treatment_n
+        if n_data.size >= 3 and np.ptp(n_data) > 0:
+            density = gaussian_kde_grid(n_data, n_range_vals)
+            density = density / density.max() * ridge_height * 1.2
 
-        try:
-            kde = stats.gaussian_kde(treatment_data)
-            density = kde(st_range_vals)
+            y_baseline = pos * (ridge_height * 0.9)
+            y_values = y_baseline + density
+
+            # Fill area - clickable with treatment info
+            ridge_n_traces.append(
+                go.Scatter(
+                    x=n_grid_closed,
+                    y=np.concatenate((y_values, np.full(n_points, y_baseline))),
+                    fill='toself',
+                    fillcolor=fillcolors[treatment],
+                    line=dict(color=color, width=1.5),
+                    showlegend=False,
+                    name=f'ridge_n_{treatment}',
+                    hovertemplate=f'<b>{treatment}</b><br>Mean N: {n_mean:.2f}%<br>Click to show centroid on scatter plot<extra></extra>',
+                    legendgroup=treatment,
+                    meta={'treatment': treatment, 'type': 'ridge_n'}
+                )
+            )
+
+        # ST ridgeline (right - vertical KDE, x and y swapped); same guard
+        st_data = treatment_st
+        if st_data.size >= 3 and np.ptp(st_data) > 0:
+            density = gaussian_kde_grid(st_data, st_range_vals)
             density = density / density.max() * ridge_height
-        except:
-            continue
 
-        # Baseline position based on treatment order
-        pos = position_map[treatment]
-        x_baseline = pos * (ridge_height * 0.9)
-        x_values = x_baseline + density
+            x_baseline = pos * (ridge_height * 0.9)
+            x_values = x_baseline + density
+
+            ridge_st_traces.append(
+                go.Scatter(
+                    x=np.concatenate((x_values, np.full(n_points, x_baseline))),
+                    y=st_grid_closed,
+                    fill='toself',
+                    fillcolor=fillcolors[treatment],
+                    line=dict(color=color, width=1.5),
+                    showlegend=False,
+                    name=f'ridge_st_{treatment}',
+                    hovertemplate=f'<b>{treatment}</b><br>Mean ST: {st_mean:.1f} mg/g<br>Click to show centroid on scatter plot<extra></extra>',
+                    legendgroup=treatment,
+                    meta={'treatment': treatment, 'type': 'ridge_st'}
+                )
+            )
+
+    # One hidden centroid trace for all treatments (initially empty); the
+    # click handler restyles its point arrays from the data stashed in meta
+    centroid_trace = go.Scatter(
+        x=[],
+        y=[],
+        mode='markers+text',
+        marker=dict(symbol='diamond', size=18, color=[],
+                   line=dict(color='white', width=2)),
+        text=[],
+        textposition='top center',
+        textfont=dict(size=11, color=[], family='Arial Black'),
+        showlegend=False,
+        visible=False,
+        name='centroid_scatter',
+        hovertemplate='<b>%{text} Centroid</b><br>N: %{x:.2f}%<br>ST: %{y:.1f} mg/g<extra></extra>',
+        meta={
+            'treatments': [p[0] for p in centroid_points],
+            'x': [p[1] for p in centroid_points],
+            'y': [p[2] for p in centroid_points],
+            'colors': [p[3] for p in centroid_points]
+        }
+    )
 
-        color = TREATMENT_COLORS[treatment]
-        st_mean = centroids[treatment]['st_mean']
-
-        # Fill area (x and y swapped for vertical orientation)
-        fig.add_trace(
-            go.Scatter(
-                x=list(x_values) + [x_baseline] * len(st_range_vals),
-                y=list(st_range_vals) + list(st_range_vals)[::-1],
-                fill='toself',
-                fillcolor=hex_to_rgba(color, fill_opacity),
-                line=dict(color=color, width=1.5),
-                showlegend=False,
-                name=f'ridge_st_{treatment}',
-                hovertemplate=f'<b>{treatment}</b><br>Mean ST: {st_mean:.1f} mg/g<br>Click to show centroid on scatter plot<extra></extra>',
-                legendgroup=treatment,
-                meta={'treatment': treatment, 'type': 'ridge_st'}
-            ),
-            row=2, col=2
-        )
+    # Ridges are drawn in reversed order so N10 is drawn last (on top)
+    ridge_n_traces.reverse()
+    ridge_st_traces.reverse()
+
+    # Bulk-add: one subplot lookup per batch instead of one per trace
+    bottom_left = scatter_traces + [centroid_trace]
+    fig.add_traces(bottom_left, rows=[2] * len(bottom_left), cols=[1] * len(bottom_left))
+    fig.add_traces(ridge_n_traces, rows=[1] * len(ridge_n_traces), cols=[1] * len(ridge_n_traces))
+    fig.add_traces(ridge_st_traces, rows=[2] * len(ridge_st_traces), cols=[2] * len(ridge_st_traces))
 
     # =========================================================================
     # LAYOUT UPDATES
@@ -426,65 +527,57 @@ def create_summary_stats(df):
     """Create summary statistics table."""
     stats_data = []
 
+    # One Cython groupby pass for all per-treatment reductions
+    agg = df.groupby('treatment', observed=True).agg(
+        samples=('N_Value', 'size'),
+        dates=('date_ordinal', 'nunique'),
+        n_mean=('N_Value', 'mean'),
+        n_std=('N_Value', 'std'),
+        st_mean=('ST_Value', 'mean'),
+        st_std=('ST_Value', 'std')
+    )
+
     for treatment in TREATMENT_ORDER:
-        treatment_df = df[df['treatment'] == treatment]
-        n_trees = len(NPK_TREATMENTS[treatment])
-        n_samples = len(treatment_df)
-        n_dates = treatment_df['parsed_date'].dt.date.nunique()
+        if treatment not in agg.index:
+            continue
+        row = agg.loc[treatment]
 
         stats_data.append({
             'Treatment': treatment,
             'N Level': TREATMENT_DESCRIPTIONS[treatment].split('(')[1].rstrip(')'),
-            'Trees': n_trees,
-            'Samples': n_samples,
-            'Dates': n_dates,
-            'N_Value (mean ± std)': f"{treatment_df['N_Value'].mean():.2f} ± {treatment_df['N_Value'].std():.2f}",
-            'ST_Value (mean ± std)': f"{treatment_df['ST_Value'].mean():.1f} ± {treatment_df['ST_Value'].std():.1f}"
+            'Trees': len(NPK_TREATMENTS[treatment]),
+            'Samples': int(row['samples']),
+            'Dates': int(row['dates']),
+            'N_Value (mean ± std)': f"{row['n_mean']:.2f} ± {row['n_std']:.2f}",
+            'ST_Value (mean ± std)': f"{row['st_mean']:.1f} ± {row['st_std']:.1f}"
         })
 
     stats_df = pd.DataFrame(stats_data)
 
-    # Create HTML table
-    table_html = '<table class="treatment-table" style="width: 100%;">'
-    table_html += '<tr>'
-    for col in stats_df.columns:
-        table_html += f'<th>{col}</th>'
-    table_html += '</tr>'
-
-    for _, row in stats_df.iterrows():
-        table_html += '<tr>'
-        for col in stats_df.columns:
-            if col == 'Treatment':
-                color = TREATMENT_COLORS.get(row[col], '#333')
-                table_html += f'<td style="color: {color}; font-weight: bold;">{row[col]}</td>'
-            else:
-                table_html += f'<td>{row[col]}</td>'
-        table_html += '</tr>'
-
-    table_html += '</table>'
+    # Create HTML table: one format call per row via the preformatted
+    # template, one final join sized once
+    parts = ['<table class="treatment-table" style="width: 100%;">', '<tr>']
+    parts.extend(f'<th>{col}</th>' for col in stats_df.columns)
+    parts.append('</tr>')
+    parts.extend(
+        SUMMARY_ROW_TEMPLATE.format_map(
+            {**record, 'color': TREATMENT_COLORS.get(record['Treatment'], '#333')}
+        )
+        for record in stats_df.to_dict('records')
+    )
+    parts.append('</table>')
 
-    return table_html
+    return ''.join(parts)
 
 
 # =============================================================================
 # HTML REPORT GENERATION
 # =============================================================================
 
-def generate_html_report(df):
-    """Generate the complete HTML report."""
-    print("Generating visualizations...")
-
-    # Create all components
-    treatment_table = create_treatment_table(df)
-    fig_timeline = create_timeline_chart(df)
-    fig_combined = create_combined_scatter_ridgeline(df)
-
-    # Convert to HTML
-    plot_timeline = fig_timeline.to_html(full_html=False, include_plotlyjs='cdn')
-    plot_combined = fig_combined.to_html(full_html=False, include_plotlyjs=False)
-
-    # JavaScript for interactive ridge plot - toggle centroids on scatter plot
-    ridge_interactivity_js = """
+# JavaScript for interactive ridge plot - toggle centroids on scatter plot.
+# The trace index maps are precompiled at report-generation time (see
+# build_ridge_click_js) so the handler never scans trace names at runtime
+RIDGE_INTERACTIVITY_JS = Template("""
     <script>
     document.addEventListener('DOMContentLoaded', function() {
         // Wait for Plotly to render
@@ -494,58 +587,76 @@ def generate_html_report(df):
             if (plotDivs.length < 2) return;
 
             const plotDiv = plotDivs[1];
-            const treatments = ['N10', 'N40', 'N60', 'N100', 'N150'];
+
+            // Trace index maps baked in by Python
+            const RIDGE_MAP = ${ridge_map};
+            const CENTROID_IDX = ${centroid_idx};
+            const centroidData = plotDiv.data[CENTROID_IDX].meta;
 
             // Track which centroids are currently visible (toggle state)
             const centroidVisible = {};
-            treatments.forEach(t => centroidVisible[t] = false);
-
-            // Find trace indices for centroids on scatter plot
-            const centroidIndices = {};
-            plotDiv.data.forEach((trace, idx) => {
-                const name = trace.name || '';
-                treatments.forEach(t => {
-                    if (name === 'centroid_scatter_' + t) {
-                        centroidIndices[t] = idx;
-                    }
-                });
-            });
+            centroidData.treatments.forEach(t => centroidVisible[t] = false);
 
             plotDiv.on('plotly_click', function(data) {
-                const clickedTrace = data.points[0];
-                const traceName = clickedTrace.data.name || '';
-
-                // Check if clicked on a ridge (N or ST)
-                let clickedTreatment = null;
-                treatments.forEach(t => {
-                    if (traceName.includes('ridge_') && traceName.includes(t)) {
-                        clickedTreatment = t;
-                    }
-                });
-
+                const clickedTreatment = RIDGE_MAP[data.points[0].curveNumber];
                 if (!clickedTreatment) return;
 
                 // Toggle the centroid visibility for this treatment
                 centroidVisible[clickedTreatment] = !centroidVisible[clickedTreatment];
 
-                // Update visibility for the centroid on scatter plot
-                const idx = centroidIndices[clickedTreatment];
-                if (idx !== undefined) {
-                    const visArray = new Array(plotDiv.data.length).fill(undefined);
-                    visArray[idx] = centroidVisible[clickedTreatment];
-                    Plotly.restyle(plotDiv, {visible: visArray});
-                }
+                // Rebuild the centroid point arrays from the toggled set and
+                // restyle the one centroid trace
+                const xs = [], ys = [], texts = [], colors = [];
+                centroidData.treatments.forEach((t, i) => {
+                    if (centroidVisible[t]) {
+                        xs.push(centroidData.x[i]);
+                        ys.push(centroidData.y[i]);
+                        texts.push(t);
+                        colors.push(centroidData.colors[i]);
+                    }
+                });
+                Plotly.restyle(plotDiv, {
+                    x: [xs],
+                    y: [ys],
+                    text: [texts],
+                    'marker.color': [colors],
+                    'textfont.color': [colors],
+                    visible: xs.length > 0
+                }, [CENTROID_IDX]);
             });
         }, 500);
     });
     </script>
-    """
+    """)
+
+
+def build_ridge_click_js(fig):
+    """Precompile the curveNumber->treatment and centroid index maps."""
+    ridge_map = {}
+    centroid_idx = None
+    for idx, trace in enumerate(fig.data):
+        name = trace.name or ''
+        if name == 'centroid_scatter':
+            centroid_idx = idx
+        elif name.startswith('ridge_'):
+            ridge_map[idx] = name.rsplit('_', 1)[1]
+
+    if centroid_idx is None:
+        return ''
+
+    return RIDGE_INTERACTIVITY_JS.substitute(
+        ridge_map=json.dumps(ridge_map),
+        centroid_idx=centroid_idx
+    )
 
-    html_content = f"""<!DOCTYPE html>
+# Static page shell precomputed once at import; substitution is a single
+# C-level pass instead of rebuilding the literal on every call
+HTML_TEMPLATE = Template("""<!DOCTYPE html>
 <html>
 <head>
     <title>Visualization 3: NPK Experiment</title>
-    {HTML_STYLE}
+    <script src="../shared/plotly.min.js"></script>
+    ${style}
 </head>
 <body>
     <h1>NPK Experiment: 5 Nitrogen Treatments on Citrus (Gilat Station)</h1>
@@ -553,19 +664,48 @@ def generate_html_report(df):
 
     <div class="analysis-section">
         <p style="margin-bottom: 15px; color: #555;">NPK stands for <strong>Nitrogen (N)</strong>, <strong>Phosphorus (P)</strong>, and <strong>Potassium (K)</strong> - the three primary nutrients for plant growth.<br>In this experiment, we focus on <strong>Nitrogen treatments</strong>, testing 5 different application rates.</p>
-        {treatment_table}
-        {plot_timeline}
+        ${treatment_table}
+        ${plot_timeline}
     </div>
 
     <div class="analysis-section">
-        {plot_combined}
+        ${plot_combined}
     </div>
 
-    {ridge_interactivity_js}
+    ${ridge_interactivity_js}
 </body>
-</html>"""
+</html>""")
+
+
+def generate_html_report(df):
+    """Generate the complete HTML report."""
+    print("Generating visualizations...")
 
-    return html_content
+    # NaN rows filtered up front; the combined chart groups internally via
+    # raw positional index arrays
+    df_valid = df.loc[df['N_Value'].notna().values & df['ST_Value'].notna().values]
+
+    # Create all components
+    treatment_table = create_treatment_table(df)
+    fig_timeline = create_timeline_chart(df)
+    fig_combined = create_combined_scatter_ridgeline(df_valid)
+
+    # Convert to HTML; the timeline keeps to_html for its CDN script tag,
+    # the combined figure is inlined as one JSON payload + Plotly.newPlot
+    # validate=False: figures are built internally, so the Python-level
+    # schema validation pass over every trace attribute is skipped;
+    # plotly.js comes from the shared vendored copy via the script tag in
+    # the template head instead of a CDN fetch
+    plot_timeline = fig_timeline.to_html(full_html=False, include_plotlyjs=False, validate=False)
+    plot_combined = fig_to_div(fig_combined, 'combined-figure')
+
+    return HTML_TEMPLATE.substitute(
+        style=HTML_STYLE,
+        treatment_table=treatment_table,
+        plot_timeline=plot_timeline,
+        plot_combined=plot_combined,
+        ridge_interactivity_js=build_ridge_click_js(fig_combined)
+    )
 
 
 # =============================================================================
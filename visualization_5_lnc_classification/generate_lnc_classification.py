@@ -11,21 +11,52 @@ Includes:
 Author: Data Science Visualization Course Project
 """
 
+import functools
+import glob
+import hashlib
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
+import plotly.io as pio
 import os
 import sys
 from datetime import datetime
 
+# Serialize figures with orjson when available - its numpy fast path is much
+# quicker than the stdlib json encoder for the array-heavy traces here
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = 'orjson'
+except ImportError:
+    pass
+
 # Add shared config to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from shared.config import (
     TREATMENT_COLORS, TREATMENT_ORDER,
     LNC_BAND_COLORS, LNC_OCT_THRESHOLDS, LNC_MONTHLY_FACTORS,
-    HTML_STYLE, NPK_DATASET_PATH, get_threshold_for_date
+    HTML_STYLE
+)
+from shared.data_loading import load_npk_dataframe, snap_to_mid_month
+from shared.plotting import MAX_TRACE_POINTS, downsample_lttb
+
+# Thresholds precomputed once at import: a 12x4 matrix (month x boundary)
+# replaces the per-call factor multiplications in the tables and the chart.
+# Kept in float64 so the published table cells round exactly like the
+# per-month Python arithmetic they replaced
+THRESHOLD_KEYS = ('deficient_low', 'low_optimum', 'optimum_high', 'high_excess')
+MONTHLY_FACTORS = np.array([LNC_MONTHLY_FACTORS[i] for i in range(1, 13)])
+MONTHLY_THRESHOLDS = np.outer(
+    MONTHLY_FACTORS,
+    np.array([LNC_OCT_THRESHOLDS[k] for k in THRESHOLD_KEYS])
 )
 
+# Per-month cell style, indexed by month position: only October (the UC
+# Davis reference month) is highlighted
+_OCT_STYLES = [''] * 12
+_OCT_STYLES[9] = ' style="background: rgba(76, 175, 80, 0.2);"'
+
+
 # =============================================================================
 # DATA LOADING
 # =============================================================================
@@ -33,16 +64,12 @@ from shared.config import (
 def load_npk_data():
     """Load and prepare NPK experiment data."""
     print("Loading NPK dataset...")
-    df = pd.read_csv(NPK_DATASET_PATH)
-
-    df['parsed_date'] = pd.to_datetime(df['parsed_date'])
-    df['year'] = df['parsed_date'].dt.year
-    df['month'] = df['parsed_date'].dt.month
+    # Shared cached reader: parse + to_datetime happen once per CSV change
+    df = load_npk_dataframe()
 
-    # Filter to Aug 2022 - Aug 2024
-    start_date = pd.Timestamp('2022-08-01')
-    end_date = pd.Timestamp('2024-08-31')
-    df = df[(df['parsed_date'] >= start_date) & (df['parsed_date'] <= end_date)]
+    # Filter to Aug 2022 - Aug 2024; between() builds one boolean mask
+    # instead of two masks combined with &
+    df = df[df['parsed_date'].between('2022-08-01', '2024-08-31')]
 
     print(f"Loaded {len(df)} NPK samples (Aug 2022 - Aug 2024)")
     return df
@@ -52,90 +79,68 @@ def load_npk_data():
 # VISUALIZATION FUNCTIONS
 # =============================================================================
 
+# Both tables depend only on module-level constants, so they are built at
+# most once per process
+@functools.cache
 def create_thresholds_table():
     """Create dynamic monthly thresholds table based on UC Davis October reference."""
     months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
 
-    # Calculate all 4 monthly thresholds
-    monthly_deficient_low = [LNC_OCT_THRESHOLDS['deficient_low'] * LNC_MONTHLY_FACTORS[i] for i in range(1, 13)]
-    monthly_low_optimum = [LNC_OCT_THRESHOLDS['low_optimum'] * LNC_MONTHLY_FACTORS[i] for i in range(1, 13)]
-    monthly_optimum_high = [LNC_OCT_THRESHOLDS['optimum_high'] * LNC_MONTHLY_FACTORS[i] for i in range(1, 13)]
-    monthly_high_excess = [LNC_OCT_THRESHOLDS['high_excess'] * LNC_MONTHLY_FACTORS[i] for i in range(1, 13)]
-
-    table_html = '''
+    # Parts list joined once; the four boundary rows share one loop over
+    # columns of the precomputed threshold matrix
+    parts = ['''
     <h3 style="color: #1B5E20; margin-bottom: 5px;">5.1 Dynamic Monthly LNC Thresholds<br><span style="font-size: 0.7em; font-weight: normal; color: #555;">All thresholds derived from UC Davis October reference &times; seasonal factor</span></h3>
     <p style="margin-bottom: 15px; color: #555;">UC Davis provides October reference values for citrus LNC classification.<br>This reference adapted into <strong>dynamic monthly thresholds</strong> using seasonal adjustment factors that account for natural nitrogen fluctuations throughout the year.</p>
     <table class="treatment-table" style="width: 100%; margin: 20px auto; font-size: 0.9em;">
         <tr>
-            <th>Threshold</th>'''
-
-    for m in months:
-        is_oct = (m == 'Oct')
-        style = ' style="background: rgba(76, 175, 80, 0.2);"' if is_oct else ''
-        table_html += f'<th{style}>{m}</th>'
-    table_html += '</tr>'
-
-    # High/Excess boundary row (top - highest values)
-    table_html += '<tr><td style="font-weight: bold; color: #388E3C;">High/Excess</td>'
-    for i, val in enumerate(monthly_high_excess):
-        is_oct = (i == 9)
-        style = ' style="background: rgba(76, 175, 80, 0.2);"' if is_oct else ''
-        table_html += f'<td{style}>{val:.2f}%</td>'
-    table_html += '</tr>'
-
-    # Optimum/High boundary row
-    table_html += '<tr><td style="font-weight: bold; color: #4CAF50;">Optimum/High</td>'
-    for i, val in enumerate(monthly_optimum_high):
-        is_oct = (i == 9)
-        style = ' style="background: rgba(76, 175, 80, 0.2);"' if is_oct else ''
-        table_html += f'<td{style}>{val:.2f}%</td>'
-    table_html += '</tr>'
-
-    # Low/Optimum boundary row
-    table_html += '<tr><td style="font-weight: bold; color: #81C784;">Low/Optimum</td>'
-    for i, val in enumerate(monthly_low_optimum):
-        is_oct = (i == 9)
-        style = ' style="background: rgba(76, 175, 80, 0.2);"' if is_oct else ''
-        table_html += f'<td{style}>{val:.2f}%</td>'
-    table_html += '</tr>'
-
-    # Deficient/Low boundary row (bottom - lowest values)
-    table_html += '<tr><td style="font-weight: bold; color: #C8E6C9;">Deficient/Low</td>'
-    for i, val in enumerate(monthly_deficient_low):
-        is_oct = (i == 9)
-        style = ' style="background: rgba(76, 175, 80, 0.2);"' if is_oct else ''
-        table_html += f'<td{style}>{val:.2f}%</td>'
-    table_html += '</tr>'
+            <th>Threshold</th>''']
+
+    parts.extend(f'<th{_OCT_STYLES[i]}>{m}</th>' for i, m in enumerate(months))
+    parts.append('</tr>')
+
+    # Boundary rows, highest to lowest values
+    boundary_rows = [
+        ('High/Excess', '#388E3C', 3),
+        ('Optimum/High', '#4CAF50', 2),
+        ('Low/Optimum', '#81C784', 1),
+        ('Deficient/Low', '#C8E6C9', 0),
+    ]
+    for label, color, col in boundary_rows:
+        parts.append(f'<tr><td style="font-weight: bold; color: {color};">{label}</td>')
+        parts.extend(
+            f'<td{_OCT_STYLES[i]}>{val:.2f}%</td>'
+            for i, val in enumerate(MONTHLY_THRESHOLDS[:, col])
+        )
+        parts.append('</tr>')
 
     # Seasonal factor row
-    table_html += '<tr style="font-size: 0.85em; color: #666;"><td>Seasonal Factor</td>'
-    for i in range(1, 13):
-        factor = LNC_MONTHLY_FACTORS[i]
-        is_oct = (i == 10)
-        style = ' style="background: rgba(76, 175, 80, 0.2);"' if is_oct else ''
-        table_html += f'<td{style}>{factor:.3f}</td>'
-    table_html += '</tr>'
+    parts.append('<tr style="font-size: 0.85em; color: #666;"><td>Seasonal Factor</td>')
+    parts.extend(
+        f'<td{_OCT_STYLES[i]}>{factor:.3f}</td>'
+        for i, factor in enumerate(MONTHLY_FACTORS)
+    )
+    parts.append('</tr>')
 
-    table_html += '''
+    parts.append('''
     </table>
     <p style="font-size: 0.85em; color: #666; margin-top: 10px;"><em>October (highlighted) = UC Davis reference month (factor = 1.000). Other months adjusted based on seasonal nitrogen patterns in citrus leaves.</em></p>
-    '''
-    return table_html
+    ''')
+    return ''.join(parts)
 
 
+@functools.cache
 def create_seasonal_factors_table():
     """Create monthly seasonal adjustment factors table."""
     months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
 
-    table_html = '<table class="treatment-table" style="width: 100%; margin: 20px auto;">'
-    table_html += '<tr><th>Month</th>'
-    for m in months:
-        table_html += f'<th>{m}</th>'
-    table_html += '</tr>'
+    # Parts list joined once instead of += on a growing string
+    parts = ['<table class="treatment-table" style="width: 100%; margin: 20px auto;">', '<tr><th>Month</th>']
+    parts.extend(f'<th>{m}</th>' for m in months)
+    parts.append('</tr>')
 
-    table_html += '<tr><td style="font-weight: bold;">Factor</td>'
+    parts.append('<tr><td style="font-weight: bold;">Factor</td>')
     for i in range(1, 13):
         factor = LNC_MONTHLY_FACTORS[i]
         # Color code based on factor
@@ -145,23 +150,19 @@ def create_seasonal_factors_table():
             color = 'rgba(135, 206, 250, 0.3)'
         else:
             color = 'rgba(78, 205, 196, 0.3)'
-        table_html += f'<td style="background: {color};">{factor:.3f}</td>'
-    table_html += '</tr>'
+        parts.append(f'<td style="background: {color};">{factor:.3f}</td>')
+    parts.append('</tr>')
 
-    table_html += '<tr><td style="font-weight: bold;">Optimum Low</td>'
-    for i in range(1, 13):
-        threshold = LNC_OCT_THRESHOLDS['low_optimum'] * LNC_MONTHLY_FACTORS[i]
-        table_html += f'<td>{threshold:.2f}%</td>'
-    table_html += '</tr>'
+    parts.append('<tr><td style="font-weight: bold;">Optimum Low</td>')
+    parts.extend(f'<td>{v:.2f}%</td>' for v in MONTHLY_THRESHOLDS[:, 1])
+    parts.append('</tr>')
 
-    table_html += '<tr><td style="font-weight: bold;">Optimum High</td>'
-    for i in range(1, 13):
-        threshold = LNC_OCT_THRESHOLDS['optimum_high'] * LNC_MONTHLY_FACTORS[i]
-        table_html += f'<td>{threshold:.2f}%</td>'
-    table_html += '</tr>'
+    parts.append('<tr><td style="font-weight: bold;">Optimum High</td>')
+    parts.extend(f'<td>{v:.2f}%</td>' for v in MONTHLY_THRESHOLDS[:, 2])
+    parts.append('</tr>')
 
-    table_html += '</table>'
-    return table_html
+    parts.append('</table>')
+    return ''.join(parts)
 
 
 def create_lnc_classification_chart(df):
@@ -169,88 +170,94 @@ def create_lnc_classification_chart(df):
     min_date = df['parsed_date'].min()
     max_date = df['parsed_date'].max()
 
-    # Create monthly date range for threshold curves
+    # Create monthly date range for threshold curves; mid-month datetime64
+    # array so Plotly serializes it as a typed array, not Timestamp objects
     start_threshold = pd.Timestamp('2022-07-01')
     end_threshold = pd.Timestamp('2024-09-01')
-    monthly_dates = pd.date_range(start=start_threshold, end=end_threshold, freq='MS')
-    monthly_dates = [d.replace(day=15) for d in monthly_dates]
-
-    # Calculate threshold values
-    t1_values = [get_threshold_for_date(d, 'deficient_low') for d in monthly_dates]
-    t2_values = [get_threshold_for_date(d, 'low_optimum') for d in monthly_dates]
-    t3_values = [get_threshold_for_date(d, 'optimum_high') for d in monthly_dates]
-    t4_values = [get_threshold_for_date(d, 'high_excess') for d in monthly_dates]
+    month_starts = pd.date_range(start=start_threshold, end=end_threshold, freq='MS')
+    monthly_dates = month_starts.to_numpy().astype('datetime64[M]') + np.timedelta64(14, 'D')
 
-    fig = go.Figure()
+    # Calculate threshold values: one row-index into the precomputed
+    # month x boundary matrix per date, no per-date arithmetic at all
+    month_rows = MONTHLY_THRESHOLDS[month_starts.month.to_numpy() - 1]
+    t1_values = month_rows[:, 0]
+    t2_values = month_rows[:, 1]
+    t3_values = month_rows[:, 2]
+    t4_values = month_rows[:, 3]
 
     BOUNDARY_LINE_COLOR = 'rgba(80, 80, 80, 0.5)'
     LINE_WIDTH = 0.5  # Very thin lines
     LINE_SHAPE = 'spline'
+    boundary_line = dict(color=BOUNDARY_LINE_COLOR, width=LINE_WIDTH, shape=LINE_SHAPE)
+
+    # Collect every trace in a list and hand them to the Figure in one go,
+    # so plotly validates the batch once instead of per add_trace call
+
+    # Threshold bands (bottom to top)
+    traces = [
+        # Floor
+        go.Scatter(
+            x=monthly_dates, y=np.full(monthly_dates.size, 1.5, dtype=np.float32),
+            mode='lines', line=dict(width=0, shape=LINE_SHAPE),
+            showlegend=False, hoverinfo='skip', name='_floor'
+        ),
+        go.Scatter(
+            x=monthly_dates, y=t1_values,
+            mode='lines', name='Deficient', line=boundary_line,
+            fill='tonexty', fillcolor=LNC_BAND_COLORS['Deficient'],
+            hovertemplate='Deficient/Low boundary: %{y:.2f}%<extra></extra>'
+        ),
+        go.Scatter(
+            x=monthly_dates, y=t2_values,
+            mode='lines', name='Low', line=boundary_line,
+            fill='tonexty', fillcolor=LNC_BAND_COLORS['Low'],
+            hovertemplate='Low/Optimum boundary: %{y:.2f}%<extra></extra>'
+        ),
+        go.Scatter(
+            x=monthly_dates, y=t3_values,
+            mode='lines', name='Optimum', line=boundary_line,
+            fill='tonexty', fillcolor=LNC_BAND_COLORS['Optimum'],
+            hovertemplate='Optimum/High boundary: %{y:.2f}%<extra></extra>'
+        ),
+        go.Scatter(
+            x=monthly_dates, y=t4_values,
+            mode='lines', name='High', line=boundary_line,
+            fill='tonexty', fillcolor=LNC_BAND_COLORS['High'],
+            hovertemplate='High/Excess boundary: %{y:.2f}%<extra></extra>'
+        ),
+        # Excess band (ceiling)
+        go.Scatter(
+            x=monthly_dates, y=np.full(monthly_dates.size, 4.2, dtype=np.float32),
+            mode='lines', name='Excess',
+            line=dict(width=0, shape=LINE_SHAPE),
+            fill='tonexty', fillcolor=LNC_BAND_COLORS['Excess'],
+            showlegend=True, hoverinfo='skip'
+        ),
+    ]
+
+    # Add treatment observations: dates snapped to the 15th with one
+    # vectorized month truncation, then a single groupby + unstack replaces
+    # the per-treatment mask and the per-row replace(day=15) lambda
+    normalized = snap_to_mid_month(df['parsed_date'])
+    monthly_avg = (
+        df.assign(normalized_date=normalized)
+        .groupby(['normalized_date', 'treatment'], sort=True, observed=True)['N_Value']
+        .mean()
+        .unstack('treatment')
+    )
 
-    # Add threshold bands (bottom to top)
-    # Floor
-    fig.add_trace(go.Scatter(
-        x=monthly_dates, y=[1.5] * len(monthly_dates),
-        mode='lines', line=dict(width=0, shape=LINE_SHAPE),
-        showlegend=False, hoverinfo='skip', name='_floor'
-    ))
-
-    # Deficient band
-    fig.add_trace(go.Scatter(
-        x=monthly_dates, y=t1_values,
-        mode='lines', name='Deficient',
-        line=dict(color=BOUNDARY_LINE_COLOR, width=LINE_WIDTH, shape=LINE_SHAPE),
-        fill='tonexty', fillcolor=LNC_BAND_COLORS['Deficient'],
-        hovertemplate='Deficient/Low boundary: %{y:.2f}%<extra></extra>'
-    ))
-
-    # Low band
-    fig.add_trace(go.Scatter(
-        x=monthly_dates, y=t2_values,
-        mode='lines', name='Low',
-        line=dict(color=BOUNDARY_LINE_COLOR, width=LINE_WIDTH, shape=LINE_SHAPE),
-        fill='tonexty', fillcolor=LNC_BAND_COLORS['Low'],
-        hovertemplate='Low/Optimum boundary: %{y:.2f}%<extra></extra>'
-    ))
-
-    # Optimum band
-    fig.add_trace(go.Scatter(
-        x=monthly_dates, y=t3_values,
-        mode='lines', name='Optimum',
-        line=dict(color=BOUNDARY_LINE_COLOR, width=LINE_WIDTH, shape=LINE_SHAPE),
-        fill='tonexty', fillcolor=LNC_BAND_COLORS['Optimum'],
-        hovertemplate='Optimum/High boundary: %{y:.2f}%<extra></extra>'
-    ))
-
-    # High band
-    fig.add_trace(go.Scatter(
-        x=monthly_dates, y=t4_values,
-        mode='lines', name='High',
-        line=dict(color=BOUNDARY_LINE_COLOR, width=LINE_WIDTH, shape=LINE_SHAPE),
-        fill='tonexty', fillcolor=LNC_BAND_COLORS['High'],
-        hovertemplate='High/Excess boundary: %{y:.2f}%<extra></extra>'
-    ))
-
-    # Excess band (ceiling)
-    fig.add_trace(go.Scatter(
-        x=monthly_dates, y=[4.2] * len(monthly_dates),
-        mode='lines', name='Excess',
-        line=dict(width=0, shape=LINE_SHAPE),
-        fill='tonexty', fillcolor=LNC_BAND_COLORS['Excess'],
-        showlegend=True, hoverinfo='skip'
-    ))
-
-    # Add treatment observations
     for treatment in TREATMENT_ORDER:
-        trt_df = df[df['treatment'] == treatment].copy()
-        if len(trt_df) > 0:
-            trt_df['normalized_date'] = trt_df['parsed_date'].apply(lambda d: d.replace(day=15))
-            monthly_avg = trt_df.groupby('normalized_date')['N_Value'].mean().reset_index()
-            monthly_avg = monthly_avg.sort_values('normalized_date')
-
-            fig.add_trace(go.Scatter(
-                x=monthly_avg['normalized_date'],
-                y=monthly_avg['N_Value'],
+        trt_avg = monthly_avg.get(treatment)
+        if trt_avg is not None:
+            trt_avg = trt_avg.dropna()
+            # Thin dense series before they reach Plotly; monthly means sit
+            # well under the cap so this only fires as the data grows
+            if trt_avg.size > MAX_TRACE_POINTS:
+                trt_avg = trt_avg.iloc[downsample_lttb(trt_avg.index, trt_avg.to_numpy())]
+
+            traces.append(go.Scatter(
+                x=trt_avg.index.to_numpy(),
+                y=trt_avg.to_numpy(dtype='float32'),
                 mode='lines+markers',
                 name=treatment,
                 line=dict(color=TREATMENT_COLORS[treatment], width=2),
@@ -258,6 +265,8 @@ def create_lnc_classification_chart(df):
                 hovertemplate=f'{treatment}<br>%{{x|%B %Y}}<br>N: %{{y:.2f}}%<extra></extra>'
             ))
 
+    fig = go.Figure(data=traces)
+
     # Add year boundary marker
     fig.add_shape(
         type="line",
@@ -272,10 +281,10 @@ def create_lnc_classification_chart(df):
         font=dict(size=10, color="black")
     )
 
+    # Title font and the bottom legend come from the shared 'crops' template
     fig.update_layout(
         title=dict(
-            text="5.2 LNC Timeline with Dynamic Thresholds: N60+ Treatments Remain in Optimum Band<br><sup>Curves connect monthly mean values | Threshold bands follow seasonal adjustment factors | N60, N100, N150 converge in green Optimum zone throughout 2 years</sup>",
-            font=dict(size=16)
+            text="5.2 LNC Timeline with Dynamic Thresholds: N60+ Treatments Remain in Optimum Band<br><sup>Curves connect monthly mean values | Threshold bands follow seasonal adjustment factors | N60, N100, N150 converge in green Optimum zone throughout 2 years</sup>"
         ),
         xaxis=dict(
             title="Date",
@@ -288,13 +297,6 @@ def create_lnc_classification_chart(df):
             range=[1.5, 4.2]
         ),
         height=700,
-        legend=dict(
-            orientation='h',
-            yanchor='top',
-            y=-0.15,
-            xanchor='center',
-            x=0.5
-        ),
         hovermode='x unified'
     )
 
@@ -305,21 +307,69 @@ def create_lnc_classification_chart(df):
 # HTML REPORT GENERATION
 # =============================================================================
 
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+# Part of every fragment cache key alongside the data hash; bump after
+# editing the chart builder (colors, bands, titles, ...) so stale
+# fragments are discarded - same role as _CACHE_VERSION in the shared
+# loader
+_FRAGMENT_CACHE_VERSION = 2
+
+
+def _df_fingerprint(df):
+    """Content hash of the columns the classification chart reads."""
+    digest = hashlib.md5()
+    digest.update(df['parsed_date'].to_numpy().tobytes())
+    digest.update(df['treatment'].astype('category').cat.codes.to_numpy().tobytes())
+    digest.update(df['N_Value'].to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _classification_plot_html(df):
+    """Return the classification chart fragment, cached by data content.
+
+    Serializing the chart dominates the build; when the underlying columns
+    are byte-identical to a previous run (and the chart code version is
+    unchanged) the stored fragment is reused and the figure is never
+    rebuilt.
+    """
+    key = f'v{_FRAGMENT_CACHE_VERSION}-{_df_fingerprint(df)}'
+    path = os.path.join(CACHE_DIR, f'classification_{key}.html')
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    fig = create_lnc_classification_chart(df)
+    # The figure is script-owned graph_objects, already validated on
+    # construction; skip the redundant spec walk during serialization
+    # Stable div id keeps the output deterministic instead of a fresh uuid
+    # per build, so cached fragments stay byte-identical
+    fragment = fig.to_html(full_html=False, include_plotlyjs=False, validate=False,
+                           div_id='lnc-chart')
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Drop fragments for stale data versions before writing the new one
+    for stale in glob.glob(os.path.join(CACHE_DIR, 'classification_*.html')):
+        os.remove(stale)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(fragment)
+    return fragment
+
+
 def generate_html_report(df):
     """Generate the complete HTML report."""
     print("Generating visualizations...")
 
-    # Create all components
+    # Create all components; plotly.js comes from the shared vendored copy
+    # via the script tag in the head instead of a per-report CDN fetch
     thresholds_table = create_thresholds_table()
-    fig_classification = create_lnc_classification_chart(df)
-
-    # Convert to HTML
-    plot_classification = fig_classification.to_html(full_html=False, include_plotlyjs='cdn')
+    plot_classification = _classification_plot_html(df)
 
     html_content = f"""<!DOCTYPE html>
 <html>
 <head>
     <title>Visualization 5: LNC Classification</title>
+    <script src="../shared/plotly.min.js"></script>
     {HTML_STYLE}
 </head>
 <body>
@@ -355,8 +405,10 @@ def main():
     html_content = generate_html_report(df)
 
     # Save
+    # 1MB write buffer so the multi-MB report goes out in a few large
+    # syscalls instead of the default small-chunk flushes
     output_path = os.path.join(os.path.dirname(__file__), 'lnc_classification.html')
-    with open(output_path, 'w', encoding='utf-8') as f:
+    with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
         f.write(html_content)
 
     print(f"\nSaved to: {output_path}")
@@ -17,17 +17,37 @@ import os
 import sys
 from datetime import datetime
 
-# Add shared config to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from shared.config import (
-    HTML_STYLE, NPK_DATASET_PATH
-)
+# Add shared config to path; __file__ is already absolute on Python 3.4+
+# so the abspath() call (and its stat of the CWD) is unnecessary
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from shared.config import HTML_STYLE
+from shared.data_loading import load_npk_dataframe, snap_to_mid_month
+from shared.plotting import fig_to_div
 
 # Colors for the three metrics (Gray + Green Accent - matches theme)
 N_COLOR = '#BDBDBD'       # Light gray - subtle background
 ST_COLOR = '#424242'      # Dark gray - higher contrast from N
 RATIO_COLOR = '#228B22'   # Forest green - matches theme title color
 
+# Three fertilization windows based on citrus phenology (winter dormancy
+# break, spring flush, summer growth): (x0, x1, fill, label x, label,
+# label color). Fixed inputs hoisted out of the chart builder
+FERT_WINDOWS = [
+    ('2023-12-05', '2024-01-23', 'rgba(135, 206, 250, 0.2)',
+     '2024-01-01', 'Winter Window', '#4682B4'),
+    ('2024-04-01', '2024-06-01', 'rgba(255, 215, 0, 0.2)',
+     '2024-05-01', 'Spring Window', '#8B6914'),
+    ('2024-07-29', '2024-08-25', 'rgba(255, 160, 122, 0.2)',
+     '2024-08-11', 'Summer Window', '#CD5C5C'),
+]
+
+# Layout fragments every builder repeats, defined once at module scope so
+# each figure hands Plotly the same prebuilt dicts instead of re-allocating
+# the literals per call (Plotly copies them during validation, so sharing
+# is safe)
+_LEGEND_H = dict(orientation='h', yanchor='top', y=-0.12, xanchor='center', x=0.5)
+_XAXIS_MONTHLY = dict(title='Date', tickformat='%b %Y', dtick='M1')
+
 # =============================================================================
 # DATA LOADING
 # =============================================================================
@@ -35,41 +55,122 @@ RATIO_COLOR = '#228B22'   # Forest green - matches theme title color
 def load_npk_data():
     """Load and prepare NPK experiment data."""
     print("Loading NPK dataset...")
-    df = pd.read_csv(NPK_DATASET_PATH)
-
-    df['parsed_date'] = pd.to_datetime(df['parsed_date'])
-    df['year'] = df['parsed_date'].dt.year
-    df['month'] = df['parsed_date'].dt.month
+    # Shared cached reader: parse + to_datetime happen once per CSV change
+    df = load_npk_dataframe()
 
     # Filter to Sep 2023 - Aug 2024 (full phenological cycle)
-    start_date = pd.Timestamp('2023-09-01')
-    end_date = pd.Timestamp('2024-08-31')
-    df = df[(df['parsed_date'] >= start_date) & (df['parsed_date'] <= end_date)]
+    df = df[df['parsed_date'].between('2023-09-01', '2024-08-31')]
 
     print(f"Loaded {len(df)} NPK samples (Sep 2023 - Aug 2024)")
     return df
 
 
 def get_monthly_averages(df):
-    """Calculate monthly averages for N, ST, and N/ST ratio."""
-    df_copy = df.copy()
-    df_copy['normalized_date'] = df_copy['parsed_date'].apply(lambda d: d.replace(day=15))
+    """Calculate monthly averages for N, ST, and N/ST ratio.
 
-    monthly_avg = df_copy.groupby('normalized_date').agg({
-        'N_Value': 'mean',
-        'ST_Value': 'mean'
-    }).reset_index()
-    monthly_avg = monthly_avg.sort_values('normalized_date')
-    monthly_avg['N_ST_Ratio'] = monthly_avg['N_Value'] / monthly_avg['ST_Value']
+    The result is cached on df.attrs, so every chart builder handed the
+    same frame shares one groupby instead of re-aggregating per figure.
+    """
+    cached = df.attrs.get('monthly_avg')
+    if cached is not None:
+        return cached
+
+    # Vectorized mid-month snap instead of a per-row replace(day=15) lambda;
+    # grouping on the key array directly skips the df.copy() that existed
+    # only to hold it as a column. groupby already sorts by the group key,
+    # so no sort_values afterwards, and one .mean() call aggregates both
+    # columns in a single cython pass instead of dispatching per column
+    # through an agg dict
+    key = snap_to_mid_month(df['parsed_date'])
+    monthly_avg = (
+        df.groupby(key)[['N_Value', 'ST_Value']].mean()
+        .rename_axis('normalized_date')
+        .reset_index()
+    )
+    monthly_avg['N_ST_Ratio'] = monthly_avg['N_Value'].to_numpy() / monthly_avg['ST_Value'].to_numpy()
 
+    df.attrs['monthly_avg'] = monthly_avg
     return monthly_avg
 
 
-def normalize(series):
-    """Normalize series to 0-100 range."""
-    if series.max() == series.min():
-        return series * 0 + 50
-    return (series - series.min()) / (series.max() - series.min()) * 100
+def _local_maxima(values):
+    """Indices of strict local maxima, found with two vectorized compares.
+
+    Replaces the per-element Python loop over neighbours in the peak
+    detectors with array slicing.
+    """
+    v = np.asarray(values)
+    if v.size < 3:
+        return np.empty(0, dtype=np.intp)
+    return np.flatnonzero((v[1:-1] > v[:-2]) & (v[1:-1] > v[2:])) + 1
+
+
+def _normalized_metrics(monthly_avg):
+    """Return (n_norm, st_norm, ratio_norm) arrays normalized to 0-100.
+
+    All three metrics are normalized in one broadcasted pass over a (3, N)
+    block instead of three per-column min/max scans. The result is cached
+    on the frame's attrs, so the two builders that plot normalized curves
+    share a single computation.
+    """
+    cached = monthly_avg.attrs.get('normalized_metrics')
+    if cached is not None:
+        return cached
+
+    block = monthly_avg[['N_Value', 'ST_Value', 'N_ST_Ratio']].to_numpy(dtype=np.float32).T
+    mn = block.min(axis=1, keepdims=True)
+    mx = block.max(axis=1, keepdims=True)
+    rng = np.where(mx == mn, 1.0, mx - mn)
+    normalized = tuple(np.where(mx == mn, 50.0, (block - mn) / rng * 100.0))
+
+    monthly_avg.attrs['normalized_metrics'] = normalized
+    return normalized
+
+
+# Per-metric source column, line color and hover template for the
+# normalized trace factory below
+_METRIC_STYLES = [
+    ('N_Value', N_COLOR, 'N: %{customdata:.2f}%<extra></extra>'),
+    ('ST_Value', ST_COLOR, 'ST: %{customdata:.1f} mg/g<extra></extra>'),
+    ('N_ST_Ratio', RATIO_COLOR, '<b>N/ST Ratio: %{customdata:.4f}</b><extra></extra>'),
+]
+
+
+def _normalized_line_traces(monthly_avg, names, context_opacity, context_marker_size):
+    """Build the three normalized N/ST/Ratio traces shared by the
+    normalized and peak-annotated charts.
+
+    One code path assembles the near-identical trace triple (dotted gray
+    context lines plus the prominent green ratio curve); callers only vary
+    legend names and context-line emphasis. Traces skip construction-time
+    validation: inputs are fixed literals plus numpy arrays.
+    """
+    dates = monthly_avg['normalized_date'].to_numpy()
+    traces = []
+    for (col, color, hover), name, y in zip(_METRIC_STYLES, names,
+                                            _normalized_metrics(monthly_avg)):
+        if col == 'N_ST_Ratio':
+            style = dict(
+                line=dict(color=color, width=5),
+                marker=dict(size=14, symbol='diamond', line=dict(width=2, color='white'))
+            )
+        else:
+            style = dict(
+                line=dict(color=color, width=2, dash='dot'),
+                marker=dict(size=context_marker_size),
+                opacity=context_opacity
+            )
+        traces.append(go.Scatter(
+            x=dates,
+            y=y,
+            mode='lines+markers',
+            name=name,
+            hovertemplate=hover,
+            customdata=monthly_avg[col].to_numpy(),
+            _validate=False,
+            **style
+        ))
+    return traces
 
 
 # =============================================================================
@@ -84,106 +185,37 @@ def create_normalized_chart(df):
     """
     monthly_avg = get_monthly_averages(df)
 
-    # Normalize
-    monthly_avg['N_norm'] = normalize(monthly_avg['N_Value'])
-    monthly_avg['ST_norm'] = normalize(monthly_avg['ST_Value'])
-    monthly_avg['Ratio_norm'] = normalize(monthly_avg['N_ST_Ratio'])
-
-    fig = go.Figure()
-
-    # Add three fertilization windows based on citrus phenology
-    # Window 1: December (winter dormancy break)
-    fig.add_vrect(
-        x0='2023-12-05', x1='2024-01-23',
-        fillcolor='rgba(135, 206, 250, 0.2)',
-        layer='below',
-        line_width=0
-    )
-    fig.add_annotation(
-        x='2024-01-01', y=108,
-        text="Winter Window",
-        showarrow=False,
-        font=dict(size=10, color='#4682B4')
+    # Fertilization windows from the module-level table, assembled as
+    # shape/annotation lists so the whole figure goes through one
+    # constructor instead of six add_vrect/add_annotation mutations
+    window_shapes = [
+        dict(type='rect', xref='x', yref='paper', y0=0, y1=1,
+             x0=x0, x1=x1, fillcolor=fill, layer='below', line_width=0)
+        for x0, x1, fill, _, _, _ in FERT_WINDOWS
+    ]
+    window_annotations = [
+        dict(x=label_x, y=108, text=label,
+             showarrow=False, font=dict(size=10, color=label_color))
+        for _, _, _, label_x, label, label_color in FERT_WINDOWS
+    ]
+
+    # Shared factory: subtle/thin N and ST context lines plus the
+    # prominent ratio curve
+    traces = _normalized_line_traces(
+        monthly_avg,
+        names=('N Value (%)', 'ST Value (mg/g)', 'N/ST Ratio'),
+        context_opacity=0.7,
+        context_marker_size=5
     )
 
-    # Window 2: April (spring flush)
-    fig.add_vrect(
-        x0='2024-04-01', x1='2024-06-01',
-        fillcolor='rgba(255, 215, 0, 0.2)',
-        layer='below',
-        line_width=0
-    )
-    fig.add_annotation(
-        x='2024-05-01', y=108,
-        text="Spring Window",
-        showarrow=False,
-        font=dict(size=10, color='#8B6914')
-    )
-
-    # Window 3: August (summer growth)
-    fig.add_vrect(
-        x0='2024-07-29', x1='2024-08-25',
-        fillcolor='rgba(255, 160, 122, 0.2)',
-        layer='below',
-        line_width=0
-    )
-    fig.add_annotation(
-        x='2024-08-11', y=108,
-        text="Summer Window",
-        showarrow=False,
-        font=dict(size=10, color='#CD5C5C')
-    )
-
-    # N Value (normalized) - subtle/thin
-    fig.add_trace(go.Scatter(
-        x=monthly_avg['normalized_date'],
-        y=monthly_avg['N_norm'],
-        mode='lines+markers',
-        name='N Value (%)',
-        line=dict(color=N_COLOR, width=2, dash='dot'),
-        marker=dict(size=5),
-        opacity=0.7,
-        hovertemplate='N: %{customdata:.2f}%<extra></extra>',
-        customdata=monthly_avg['N_Value']
-    ))
-
-    # ST Value (normalized) - subtle/thin
-    fig.add_trace(go.Scatter(
-        x=monthly_avg['normalized_date'],
-        y=monthly_avg['ST_norm'],
-        mode='lines+markers',
-        name='ST Value (mg/g)',
-        line=dict(color=ST_COLOR, width=2, dash='dot'),
-        marker=dict(size=5),
-        opacity=0.7,
-        hovertemplate='ST: %{customdata:.1f} mg/g<extra></extra>',
-        customdata=monthly_avg['ST_Value']
-    ))
-
-    # N/ST Ratio (normalized) - THE PROMINENT CURVE
-    fig.add_trace(go.Scatter(
-        x=monthly_avg['normalized_date'],
-        y=monthly_avg['Ratio_norm'],
-        mode='lines+markers',
-        name='N/ST Ratio',
-        line=dict(color=RATIO_COLOR, width=5),
-        marker=dict(size=14, symbol='diamond', line=dict(width=2, color='white')),
-        hovertemplate='<b>N/ST Ratio: %{customdata:.4f}</b><extra></extra>',
-        customdata=monthly_avg['N_ST_Ratio']
-    ))
-
-    fig.update_layout(
+    layout = dict(
+        shapes=window_shapes,
+        annotations=window_annotations,
         title=dict(
             text="N/ST Ratio: Key Indicator for Phenological Fertilization Timing<br><sup>Three fertilization windows match citrus growth phases: Winter (Dec-Jan), Spring (Apr-May), Summer (Aug)</sup>",
             font=dict(size=16)
         ),
-        xaxis=dict(
-            title='Date',
-            tickformat='%b %Y',
-            dtick='M1',
-            showgrid=True,
-            gridcolor='rgba(0,0,0,0.05)'
-        ),
+        xaxis=dict(_XAXIS_MONTHLY, showgrid=True, gridcolor='rgba(0,0,0,0.05)'),
         yaxis=dict(
             title='Normalized Value (%)',
             range=[-5, 115],
@@ -191,26 +223,19 @@ def create_normalized_chart(df):
             gridcolor='rgba(0,0,0,0.05)'
         ),
         height=550,
-        legend=dict(
-            orientation='h',
-            yanchor='top',
-            y=-0.12,
-            xanchor='center',
-            x=0.5,
-            font=dict(size=13),
-            bgcolor='rgba(255,255,255,0.8)'
-        ),
+        legend=dict(_LEGEND_H, font=dict(size=13), bgcolor='rgba(255,255,255,0.8)'),
         margin=dict(b=80),
         hovermode='x unified',
         plot_bgcolor='white'
     )
 
-    return fig
+    return go.Figure(data=traces, layout=layout)
 
 
 def create_dual_axis_chart(df):
     """Create dual-axis view showing actual values."""
     monthly_avg = get_monthly_averages(df)
+    dates = monthly_avg['normalized_date'].to_numpy()
 
     fig = make_subplots(specs=[[{"secondary_y": True}]])
 
@@ -225,8 +250,8 @@ def create_dual_axis_chart(df):
     # N Value (left y-axis)
     fig.add_trace(
         go.Scatter(
-            x=monthly_avg['normalized_date'],
-            y=monthly_avg['N_Value'],
+            x=dates,
+            y=monthly_avg['N_Value'].to_numpy(),
             mode='lines+markers',
             name='N Value (%)',
             line=dict(color=N_COLOR, width=3),
@@ -239,8 +264,8 @@ def create_dual_axis_chart(df):
     # ST Value (right y-axis)
     fig.add_trace(
         go.Scatter(
-            x=monthly_avg['normalized_date'],
-            y=monthly_avg['ST_Value'],
+            x=dates,
+            y=monthly_avg['ST_Value'].to_numpy(),
             mode='lines+markers',
             name='ST Value (mg/g)',
             line=dict(color=ST_COLOR, width=3),
@@ -251,15 +276,15 @@ def create_dual_axis_chart(df):
     )
 
     # N/ST Ratio as bar chart overlay (scaled to fit)
-    ratio_scaled = monthly_avg['N_ST_Ratio'] * 100  # Scale for visibility
+    ratio_scaled = monthly_avg['N_ST_Ratio'].to_numpy() * 100  # Scale for visibility
     fig.add_trace(
         go.Bar(
-            x=monthly_avg['normalized_date'],
+            x=dates,
             y=ratio_scaled,
             name='N/ST Ratio (×100)',
             marker=dict(color=RATIO_COLOR, opacity=0.4),
             hovertemplate='N/ST: %{customdata:.4f}<extra></extra>',
-            customdata=monthly_avg['N_ST_Ratio'],
+            customdata=monthly_avg['N_ST_Ratio'].to_numpy(),
             width=1000000000 * 20  # Width in milliseconds for monthly bars
         ),
         secondary_y=False
@@ -271,7 +296,7 @@ def create_dual_axis_chart(df):
             text="6.2 Actual Values: N% and ST Follow Different Seasonal Patterns<br><sup>Left axis: N% and N/ST ratio (×100) | Right axis: ST (mg/g) | Yellow zone = fertilization window</sup>",
             font=dict(size=16)
         ),
-        xaxis=dict(title='Date', tickformat='%b %Y', dtick='M1'),
+        xaxis=_XAXIS_MONTHLY,
         height=500,
         legend=dict(
             orientation='h',
@@ -300,13 +325,17 @@ def create_triple_axis_chart(df):
     - Right y-axis 2: N/ST Ratio
     """
     monthly_avg = get_monthly_averages(df)
+    # Raw numpy arrays for every trace input: skips Series unwrapping and
+    # serializes as compact typed arrays
+    dates = monthly_avg['normalized_date'].to_numpy()
+    ratio_values = monthly_avg['N_ST_Ratio'].to_numpy()
 
     fig = go.Figure()
 
     # N Value (left y-axis)
     fig.add_trace(go.Scatter(
-        x=monthly_avg['normalized_date'],
-        y=monthly_avg['N_Value'],
+        x=dates,
+        y=monthly_avg['N_Value'].to_numpy(),
         mode='lines+markers',
         name='N Value (%)',
         line=dict(color=N_COLOR, width=3),
@@ -317,8 +346,8 @@ def create_triple_axis_chart(df):
 
     # ST Value (right y-axis 1)
     fig.add_trace(go.Scatter(
-        x=monthly_avg['normalized_date'],
-        y=monthly_avg['ST_Value'],
+        x=dates,
+        y=monthly_avg['ST_Value'].to_numpy(),
         mode='lines+markers',
         name='ST Value (mg/g)',
         line=dict(color=ST_COLOR, width=3),
@@ -329,8 +358,8 @@ def create_triple_axis_chart(df):
 
     # N/ST Ratio (right y-axis 2)
     fig.add_trace(go.Scatter(
-        x=monthly_avg['normalized_date'],
-        y=monthly_avg['N_ST_Ratio'],
+        x=dates,
+        y=ratio_values,
         mode='lines+markers',
         name='N/ST Ratio \u2605',
         line=dict(color=RATIO_COLOR, width=4),
@@ -339,34 +368,31 @@ def create_triple_axis_chart(df):
         hovertemplate='<b>N/ST: %{y:.4f}</b><extra></extra>'
     ))
 
-    # Find and mark peaks in N/ST ratio
-    ratio_values = monthly_avg['N_ST_Ratio'].values
-    dates = monthly_avg['normalized_date'].values
-    for i in range(1, len(ratio_values) - 1):
-        if ratio_values[i] > ratio_values[i-1] and ratio_values[i] > ratio_values[i+1]:
-            fig.add_annotation(
-                x=dates[i],
-                y=ratio_values[i],
-                yref='y3',
-                text=f"\u25B2 Peak",
-                showarrow=True,
-                arrowhead=2,
-                arrowcolor=RATIO_COLOR,
-                font=dict(size=10, color=RATIO_COLOR),
-                yshift=15
-            )
+    # Find and mark peaks in N/ST ratio; the annotations are built as one
+    # list and set with the layout, one validation pass instead of one
+    # add_annotation round-trip per peak
+    peak_annotations = [
+        dict(
+            x=dates[i],
+            y=ratio_values[i],
+            yref='y3',
+            text="\u25B2 Peak",
+            showarrow=True,
+            arrowhead=2,
+            arrowcolor=RATIO_COLOR,
+            font=dict(size=10, color=RATIO_COLOR),
+            yshift=15
+        )
+        for i in _local_maxima(ratio_values)
+    ]
 
     fig.update_layout(
+        annotations=peak_annotations,
         title=dict(
             text="6.2 Triple Y-Axis: Actual Values (Non-Normalized)<br><sup>Each metric on its own scale | Peaks marked on N/ST ratio</sup>",
             font=dict(size=16)
         ),
-        xaxis=dict(
-            title='Date',
-            tickformat='%b %Y',
-            dtick='M1',
-            domain=[0.1, 0.85]
-        ),
+        xaxis=dict(_XAXIS_MONTHLY, domain=[0.1, 0.85]),
         yaxis=dict(
             title=dict(text='N Value (%)', font=dict(color=N_COLOR)),
             tickfont=dict(color=N_COLOR),
@@ -388,13 +414,7 @@ def create_triple_axis_chart(df):
             position=0.97
         ),
         height=550,
-        legend=dict(
-            orientation='h',
-            yanchor='top',
-            y=-0.12,
-            xanchor='center',
-            x=0.5
-        ),
+        legend=_LEGEND_H,
         hovermode='x unified',
         plot_bgcolor='white',
         margin=dict(r=100, b=100)
@@ -407,111 +427,84 @@ def create_peak_annotated_chart(df):
     """Create chart highlighting N/ST ratio peaks with gradient direction arrows."""
     monthly_avg = get_monthly_averages(df)
 
-    # Normalize for comparison
-    monthly_avg['N_norm'] = normalize(monthly_avg['N_Value'])
-    monthly_avg['ST_norm'] = normalize(monthly_avg['ST_Value'])
-    monthly_avg['Ratio_norm'] = normalize(monthly_avg['N_ST_Ratio'])
+    # Normalized arrays shared with create_normalized_chart via the
+    # attrs-cached helper: one (3, N) pass instead of six min/max scans
+    n_norm, st_norm, ratio_norm = _normalized_metrics(monthly_avg)
 
     fig = go.Figure()
 
-    # Add shaded regions where N_norm > ST_norm (indicating high ratio periods)
-    dates = monthly_avg['normalized_date'].tolist()
-    n_norm = monthly_avg['N_norm'].tolist()
-    st_norm = monthly_avg['ST_norm'].tolist()
-
-    # Find crossover regions
-    for i in range(len(dates) - 1):
-        if n_norm[i] > st_norm[i]:
-            fig.add_vrect(
-                x0=dates[i],
-                x1=dates[i+1] if i+1 < len(dates) else dates[i],
-                fillcolor='rgba(231, 76, 60, 0.15)',
-                layer='below',
-                line_width=0
-            )
-
-    # N Value (normalized)
-    fig.add_trace(go.Scatter(
-        x=monthly_avg['normalized_date'],
-        y=monthly_avg['N_norm'],
-        mode='lines+markers',
-        name='N Value (normalized)',
-        line=dict(color=N_COLOR, width=2, dash='dot'),
-        marker=dict(size=6),
-        opacity=0.8,
-        hovertemplate='N: %{customdata:.2f}%<extra></extra>',
-        customdata=monthly_avg['N_Value']
-    ))
-
-    # ST Value (normalized)
-    fig.add_trace(go.Scatter(
-        x=monthly_avg['normalized_date'],
-        y=monthly_avg['ST_norm'],
-        mode='lines+markers',
-        name='ST Value (normalized)',
-        line=dict(color=ST_COLOR, width=2, dash='dot'),
-        marker=dict(size=6),
-        opacity=0.8,
-        hovertemplate='ST: %{customdata:.1f} mg/g<extra></extra>',
-        customdata=monthly_avg['ST_Value']
-    ))
-
-    # N/ST Ratio (normalized) - prominent
-    fig.add_trace(go.Scatter(
-        x=monthly_avg['normalized_date'],
-        y=monthly_avg['Ratio_norm'],
-        mode='lines+markers',
-        name='N/ST Ratio \u2605',
-        line=dict(color=RATIO_COLOR, width=5),
-        marker=dict(size=14, symbol='diamond', line=dict(width=2, color='white')),
-        hovertemplate='<b>N/ST: %{customdata:.4f}</b><extra></extra>',
-        customdata=monthly_avg['N_ST_Ratio']
+    # One ndarray handoff per column, reused by shapes, traces and peak
+    # annotations below: no .tolist() boxing of dates into Python objects
+    dates = monthly_avg['normalized_date'].to_numpy()
+    ratio_actual = monthly_avg['N_ST_Ratio'].to_numpy()
+
+    # Add shaded regions where N_norm > ST_norm (indicating high ratio
+    # periods). Contiguous crossover months are merged into runs first
+    # (edge detection on the boolean mask), so adjacent per-month
+    # rectangles collapse into one shape per run: fewer layout shapes for
+    # plotly.js to resolve and paint
+
+    mask = n_norm[:-1] > st_norm[:-1]
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+
+    crossover_shapes = [
+        dict(
+            type='rect', xref='x', yref='paper',
+            x0=dates[start], x1=dates[end], y0=0, y1=1,
+            fillcolor='rgba(231, 76, 60, 0.15)',
+            layer='below',
+            line_width=0
+        )
+        for start, end in zip(run_starts, run_ends)
+    ]
+    fig.update_layout(shapes=crossover_shapes)
+
+    # Normalized N/ST/Ratio triple from the shared factory, slightly more
+    # emphasized context lines than the overview chart
+    fig.add_traces(_normalized_line_traces(
+        monthly_avg,
+        names=('N Value (normalized)', 'ST Value (normalized)', 'N/ST Ratio \u2605'),
+        context_opacity=0.8,
+        context_marker_size=6
     ))
 
-    # Find and annotate peaks with actual ratio values
-    ratio_norm = monthly_avg['Ratio_norm'].values
-    ratio_actual = monthly_avg['N_ST_Ratio'].values
-    dates = monthly_avg['normalized_date'].values
-
-    for i in range(1, len(ratio_norm) - 1):
-        if ratio_norm[i] > ratio_norm[i-1] and ratio_norm[i] > ratio_norm[i+1]:
-            month_name = pd.Timestamp(dates[i]).strftime('%b')
-            fig.add_annotation(
-                x=dates[i],
-                y=ratio_norm[i],
-                text=f"<b>PEAK</b><br>{month_name}<br>N/ST={ratio_actual[i]:.3f}",
-                showarrow=True,
-                arrowhead=2,
-                arrowcolor=RATIO_COLOR,
-                font=dict(size=11, color=RATIO_COLOR),
-                bgcolor='rgba(255,255,255,0.9)',
-                bordercolor=RATIO_COLOR,
-                borderwidth=1,
-                yshift=30
-            )
+    # Find and annotate peaks with actual ratio values; month labels come
+    # from one vectorized strftime over the dates instead of a Timestamp
+    # construction per peak
+    month_names = pd.DatetimeIndex(dates).strftime('%b')
+
+    peak_annotations = [
+        dict(
+            x=dates[i],
+            y=ratio_norm[i],
+            text=f"<b>PEAK</b><br>{month_names[i]}<br>N/ST={ratio_actual[i]:.3f}",
+            showarrow=True,
+            arrowhead=2,
+            arrowcolor=RATIO_COLOR,
+            font=dict(size=11, color=RATIO_COLOR),
+            bgcolor='rgba(255,255,255,0.9)',
+            bordercolor=RATIO_COLOR,
+            borderwidth=1,
+            yshift=30
+        )
+        for i in _local_maxima(ratio_norm)
+    ]
 
     fig.update_layout(
+        annotations=peak_annotations,
         title=dict(
             text="6.3 Peak Detection: When N/ST Ratio Reaches Maximum<br><sup>Red shaded = N higher than ST (normalized) | Peak annotations show actual ratio values</sup>",
             font=dict(size=16)
         ),
-        xaxis=dict(
-            title='Date',
-            tickformat='%b %Y',
-            dtick='M1'
-        ),
+        xaxis=_XAXIS_MONTHLY,
         yaxis=dict(
             title='Normalized Value (%)',
             range=[-5, 130]
         ),
         height=550,
-        legend=dict(
-            orientation='h',
-            yanchor='top',
-            y=-0.12,
-            xanchor='center',
-            x=0.5
-        ),
+        legend=_LEGEND_H,
         hovermode='x unified',
         plot_bgcolor='white',
         margin=dict(b=100)
@@ -523,14 +516,18 @@ def create_peak_annotated_chart(df):
 def create_ratio_focused_chart(df):
     """Create chart focused on N/ST ratio with N and ST as context lines."""
     monthly_avg = get_monthly_averages(df)
+    # Raw numpy arrays for every trace input: skips Series unwrapping and
+    # serializes as compact typed arrays
+    dates = monthly_avg['normalized_date'].to_numpy()
+    ratio_values = monthly_avg['N_ST_Ratio'].to_numpy()
 
     fig = make_subplots(specs=[[{"secondary_y": True}]])
 
     # N/ST Ratio as main focus (left y-axis) - as area fill
     fig.add_trace(
         go.Scatter(
-            x=monthly_avg['normalized_date'],
-            y=monthly_avg['N_ST_Ratio'],
+            x=dates,
+            y=ratio_values,
             mode='lines',
             name='N/ST Ratio',
             line=dict(color=RATIO_COLOR, width=4),
@@ -542,15 +539,9 @@ def create_ratio_focused_chart(df):
     )
 
     # Add peak markers
-    ratio_values = monthly_avg['N_ST_Ratio'].values
-    dates = monthly_avg['normalized_date'].values
-    peak_dates = []
-    peak_values = []
-
-    for i in range(1, len(ratio_values) - 1):
-        if ratio_values[i] > ratio_values[i-1] and ratio_values[i] > ratio_values[i+1]:
-            peak_dates.append(dates[i])
-            peak_values.append(ratio_values[i])
+    peak_idx = _local_maxima(ratio_values)
+    peak_dates = dates[peak_idx]
+    peak_values = ratio_values[peak_idx]
 
     fig.add_trace(
         go.Scatter(
@@ -570,8 +561,8 @@ def create_ratio_focused_chart(df):
     # N Value (right y-axis) - subtle context
     fig.add_trace(
         go.Scatter(
-            x=monthly_avg['normalized_date'],
-            y=monthly_avg['N_Value'],
+            x=dates,
+            y=monthly_avg['N_Value'].to_numpy(),
             mode='lines+markers',
             name='N Value (%)',
             line=dict(color=N_COLOR, width=2, dash='dot'),
@@ -583,17 +574,17 @@ def create_ratio_focused_chart(df):
     )
 
     # ST Value (right y-axis, scaled) - subtle context
-    st_scaled = monthly_avg['ST_Value'] / 50  # Scale to fit with N%
+    st_scaled = monthly_avg['ST_Value'].to_numpy() / 50  # Scale to fit with N%
     fig.add_trace(
         go.Scatter(
-            x=monthly_avg['normalized_date'],
+            x=dates,
             y=st_scaled,
             mode='lines+markers',
             name='ST Value (\u00f750)',
             line=dict(color=ST_COLOR, width=2, dash='dot'),
             marker=dict(size=6),
             opacity=0.6,
-            customdata=monthly_avg['ST_Value'],
+            customdata=monthly_avg['ST_Value'].to_numpy(),
             hovertemplate='ST: %{customdata:.1f} mg/g<extra></extra>'
         ),
         secondary_y=True
@@ -604,15 +595,9 @@ def create_ratio_focused_chart(df):
             text="6.4 N/ST Ratio Focus: Peak Identification<br><sup>Area shows ratio magnitude | Stars mark local maxima | Dotted lines show N and ST context</sup>",
             font=dict(size=16)
         ),
-        xaxis=dict(title='Date', tickformat='%b %Y', dtick='M1'),
+        xaxis=_XAXIS_MONTHLY,
         height=550,
-        legend=dict(
-            orientation='h',
-            yanchor='top',
-            y=-0.12,
-            xanchor='center',
-            x=0.5
-        ),
+        legend=_LEGEND_H,
         hovermode='x unified',
         plot_bgcolor='white',
         margin=dict(b=100)
@@ -628,20 +613,14 @@ def create_ratio_focused_chart(df):
 # HTML REPORT GENERATION
 # =============================================================================
 
-def generate_html_report(df):
-    """Generate the complete HTML report with single visualization and detailed explanations."""
-    print("Generating visualizations...")
-
-    # Create single normalized chart
-    fig_normalized = create_normalized_chart(df)
-
-    # Convert to HTML
-    plot_normalized = fig_normalized.to_html(full_html=False, include_plotlyjs='cdn')
-
-    html_content = f"""<!DOCTYPE html>
+# The shell is almost entirely static text, built once at import and split
+# around the plot fragment so the report can be streamed to the output file
+# without concatenating one monolithic string in memory
+_REPORT_PREFIX = f"""<!DOCTYPE html>
 <html>
 <head>
     <title>Visualization 6: N/ST Ratio Analysis</title>
+    <script src="../shared/plotly.min.js"></script>
     {HTML_STYLE}
 </head>
 <body>
@@ -670,12 +649,25 @@ def generate_html_report(df):
             </div>
         </div>
 
-        {plot_normalized}
+        """
+
+_REPORT_SUFFIX = """
     </div>
 </body>
 </html>"""
 
-    return html_content
+
+def generate_html_report(df, out):
+    """Stream the complete HTML report to an open file handle."""
+    print("Generating visualizations...")
+
+    # Create single normalized chart
+    fig_normalized = create_normalized_chart(df)
+
+    # Shell chunks and the plot fragment go straight to the file buffer
+    out.write(_REPORT_PREFIX)
+    out.write(fig_to_div(fig_normalized, 'nst-ratio-chart'))
+    out.write(_REPORT_SUFFIX)
 
 
 # =============================================================================
@@ -690,13 +682,13 @@ def main():
     # Load data
     df = load_npk_data()
 
-    # Generate report
-    html_content = generate_html_report(df)
-
-    # Save
+    # Generate report, streamed through a 1MB write buffer into a temp
+    # file swapped in atomically so readers never see a partial report
     output_path = os.path.join(os.path.dirname(__file__), 'nst_ratio_analysis.html')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        generate_html_report(df, f)
+    os.replace(tmp_path, output_path)
 
     print(f"\nSaved to: {output_path}")
     print("\n" + "=" * 70)